@@ -18,7 +18,10 @@ setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.7",
+    extras_require={
+        "re2": ["google-re2"],
+    },
     entry_points={
         "console_scripts": [
             "zipexcept=zipexcept.main:main",
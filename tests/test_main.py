@@ -1,12 +1,21 @@
+import contextlib
+import fnmatch
+import io
 import os
 import tempfile
 import unittest
 import zipfile
 import tarfile
 import shutil
+import subprocess
+import sys
+import types
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from unittest import mock
 
-from zipexcept.main import create_archive, read_tarignore, should_exclude
+from zipexcept.main import (IgnorePatterns, collect_files, create_archive, main,
+                             read_tarignore, should_exclude)
 
 
 class TestZipExcept(unittest.TestCase):
@@ -43,7 +52,11 @@ class TestZipExcept(unittest.TestCase):
     def test_read_tarignore(self):
         """Test that .tarignore file is read correctly"""
         patterns = read_tarignore(os.path.join(self.test_dir, ".tarignore"))
-        self.assertEqual(patterns, ["*.log", "exclude_dir/"])
+        self.assertEqual(patterns.patterns, ["*.log", "exclude_dir/"])
+        self.assertEqual(patterns.exact, set())
+        self.assertEqual(patterns.suffixes, (".log",))
+        self.assertEqual(patterns.dir_basenames, {"exclude_dir"})
+        self.assertIsNone(patterns.combined)
     
     def test_should_exclude(self):
         """Test that should_exclude correctly identifies excluded patterns"""
@@ -51,20 +64,205 @@ class TestZipExcept(unittest.TestCase):
         
         # Should be excluded
         self.assertTrue(should_exclude(
-            os.path.join(self.test_dir, "exclude_file.log"), 
-            self.test_dir, patterns))
+            "exclude_file.log", "exclude_file.log", patterns, False))
         self.assertTrue(should_exclude(
-            os.path.join(self.test_dir, "exclude_dir"),
-            self.test_dir, patterns))
+            "exclude_dir", "exclude_dir", patterns, True))
+        self.assertTrue(should_exclude(
+            "mixed_dir/exclude_dir", "exclude_dir", patterns, True))
+        self.assertFalse(should_exclude(
+            "exclude_dir2", "exclude_dir2", patterns, True))
+        
+        # A leading / anchors a directory pattern to the top level
+        anchored = ["/exclude_dir/"]
+        self.assertTrue(should_exclude("exclude_dir", "exclude_dir", anchored, True))
+        self.assertFalse(should_exclude(
+            "mixed_dir/exclude_dir", "exclude_dir", anchored, True))
         
         # Should be included
         self.assertFalse(should_exclude(
-            os.path.join(self.test_dir, "include_file.txt"),
-            self.test_dir, patterns))
+            "include_file.txt", "include_file.txt", patterns, False))
         self.assertFalse(should_exclude(
-            os.path.join(self.test_dir, "include_dir"),
-            self.test_dir, patterns))
+            "include_dir", "include_dir", patterns, True))
     
+    GLOB_PATTERNS = ["*.log", "tmp*", "*cache*", "docs/*", "*.py[co]", "a*b?"]
+    GLOB_PATHS = ["a.log", "src/a.log", "a.log.txt", "tmpfile", "src/tmpfile",
+                  "src/file_tmp", "pycache", "src/__pycache__/x.py", "docs/index.md",
+                  "src/docs/index.md", "a.pyc", "src/a.py", "src/axbc", "src/abc"]
+    
+    @staticmethod
+    def _fnmatch_excluded(rel_path, patterns):
+        """Reference implementation of the wildcard rules using fnmatch"""
+        filename = rel_path.rsplit("/", 1)[-1]
+        return any(fnmatch.fnmatch(rel_path, p) or fnmatch.fnmatch(filename, p)
+                   for p in patterns)
+    
+    def test_should_exclude_simple_globs(self):
+        """Test that the string-method fast paths agree with fnmatch"""
+        for rel_path in self.GLOB_PATHS:
+            filename = rel_path.rsplit("/", 1)[-1]
+            self.assertEqual(should_exclude(rel_path, filename, self.GLOB_PATTERNS, False),
+                             self._fnmatch_excluded(rel_path, self.GLOB_PATTERNS), rel_path)
+    
+    def test_collect_files_simple_globs(self):
+        """Test that the walk includes exactly the files fnmatch would keep"""
+        source = os.path.join(self.test_dir, "globs")
+        for rel_path in self.GLOB_PATHS:
+            path = os.path.join(source, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(rel_path)
+        
+        expected = []
+        for rel_path in self.GLOB_PATHS:
+            # A file is also left out when one of its directories is excluded
+            parts = rel_path.split("/")
+            ancestors = ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+            if not any(self._fnmatch_excluded(a, self.GLOB_PATTERNS) for a in ancestors):
+                expected.append("globs/" + rel_path)
+        
+        files = collect_files(source, self.GLOB_PATTERNS)
+        self.assertEqual(sorted(arcname for _, arcname, _ in files), sorted(expected))
+    
+    def _stub_re2(self, compile):
+        """Return a stand-in for the re2 module using ``compile``"""
+        class error(Exception):
+            pass
+        return types.SimpleNamespace(error=error, compile=mock.Mock(side_effect=compile))
+
+    def test_re2_used_when_installed(self):
+        """Test that wildcard patterns compile with re2, using its \\z anchor"""
+        re2 = self._stub_re2(lambda regex: ("re2", regex))
+        with mock.patch.dict(sys.modules, {"re2": re2}):
+            patterns = IgnorePatterns(["a*b?"])
+        self.assertEqual(patterns.combined[0], "re2")
+        regex = patterns.combined[1]
+        self.assertTrue(regex.endswith(r"\z"), regex)
+        self.assertNotIn(r"\Z", regex)
+
+    def test_re2_falls_back_to_re(self):
+        """Test that patterns re2 rejects are compiled with re instead"""
+        def reject(regex):
+            raise re2.error("unsupported")
+        re2 = self._stub_re2(reject)
+        with mock.patch.dict(sys.modules, {"re2": re2}):
+            patterns = IgnorePatterns(["a*b?"])
+        re2.compile.assert_called_once()
+        self.assertTrue(patterns.combined.match("axbc"))
+        self.assertFalse(patterns.combined.match("ab"))
+
+    def test_re2_errors_are_not_hidden(self):
+        """Test that unexpected errors from a broken re2 are raised"""
+        def broken(regex):
+            raise AttributeError("broken install")
+        with mock.patch.dict(sys.modules, {"re2": self._stub_re2(broken)}):
+            with self.assertRaises(AttributeError):
+                IgnorePatterns(["a*b?"])
+
+    def test_collect_files_prunes_excluded_dirs(self):
+        """Test that excluded directories are never scanned"""
+        os.makedirs(os.path.join(self.test_dir, "exclude_dir", "nested"))
+        patterns = read_tarignore(os.path.join(self.test_dir, ".tarignore"))
+        
+        scanned = []
+        real_scandir = os.scandir
+        
+        def scandir(path):
+            scanned.append(path)
+            return real_scandir(path)
+        
+        with mock.patch("zipexcept.main.os.scandir", side_effect=scandir):
+            files = collect_files(self.test_dir, patterns)
+        
+        self.assertFalse(any("exclude_dir" in path for path in scanned))
+        arcnames = sorted(arcname.split("/", 1)[1] for _, arcname, _ in files)
+        self.assertEqual(arcnames, [".tarignore", "include_file.txt", "mixed_dir/include.txt"])
+    
+    def test_collect_files_warns_about_fully_excluded_dirs(self):
+        """Test that directories contributing no files are reported once"""
+        os.makedirs(os.path.join(self.test_dir, "logs", "old"))
+        for name in ("logs/a.log", "logs/old/b.log"):
+            with open(os.path.join(self.test_dir, name), "w") as f:
+                f.write("exclude")
+        patterns = read_tarignore(os.path.join(self.test_dir, ".tarignore"))
+        
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            collect_files(self.test_dir, patterns)
+        self.assertEqual(stderr.getvalue(), "")
+        
+        with contextlib.redirect_stderr(stderr):
+            collect_files(self.test_dir, patterns, warn=True)
+        
+        warnings = stderr.getvalue().splitlines()
+        self.assertEqual(len(warnings), 1)
+        self.assertIn("every file under 'logs/'", warnings[0])
+        self.assertIn("add 'logs/'", warnings[0])
+
+    def test_collect_files_warning_does_not_over_match(self):
+        """Test that the suggested pattern keeps other directories of that name"""
+        for name in ("logs/a.log", "src/logs/README", "src/old/logs/b.log"):
+            path = os.path.join(self.test_dir, *name.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(name)
+        patterns = read_tarignore(os.path.join(self.test_dir, ".tarignore"))
+        
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            collect_files(self.test_dir, patterns, warn=True)
+        
+        warnings = sorted(stderr.getvalue().splitlines())
+        self.assertEqual(len(warnings), 2)
+        self.assertIn("'logs/' is excluded; add '/logs/'", warnings[0])
+        self.assertIn("'src/old/' is excluded; add 'old/'", warnings[1])
+        for pattern in ("/logs/", "old/"):
+            files = collect_files(self.test_dir, patterns.patterns + [pattern])
+            self.assertIn("src/logs/README",
+                          [arcname.split("/", 1)[1] for _, arcname, _ in files])
+
+    def _collect_with_workers(self, workers):
+        """Return the (path, arcname) pairs and stderr of collect_files"""
+        patterns = read_tarignore(os.path.join(self.test_dir, ".tarignore"))
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            files = collect_files(self.test_dir, patterns, workers, warn=True)
+        return sorted((path, arcname) for path, arcname, _ in files), stderr.getvalue()
+
+    def test_collect_files_parallel(self):
+        """Test that a parallel scan finds the same files as a serial one"""
+        for rel_dir in ("a/b/c", "a/exclude_dir/d", "logs/old", "e"):
+            os.makedirs(os.path.join(self.test_dir, *rel_dir.split("/")))
+        for name in ("a/1.txt", "a/b/2.txt", "a/b/c/3.txt", "a/exclude_dir/d/4.txt",
+                     "logs/a.log", "logs/old/b.log", "e/5.txt"):
+            with open(os.path.join(self.test_dir, *name.split("/")), "w") as f:
+                f.write(name)
+
+        serial = self._collect_with_workers(1)
+        parallel = self._collect_with_workers(4)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(len(serial[0]), 7)
+        self.assertIn("'logs/'", serial[1])
+
+    def test_collect_files_unreadable_dir(self):
+        """Test that an unreadable directory is skipped by both scans"""
+        os.makedirs(os.path.join(self.test_dir, "mixed_dir", "private"))
+        with open(os.path.join(self.test_dir, "mixed_dir", "private", "secret.txt"), "w") as f:
+            f.write("secret")
+        unreadable = os.path.join(self.test_dir, "mixed_dir", "private")
+        real_scandir = os.scandir
+
+        def scandir(path):
+            if path == unreadable:
+                raise PermissionError(13, "Permission denied", path)
+            return real_scandir(path)
+
+        for workers in (1, 4):
+            with mock.patch("zipexcept.main.os.scandir", side_effect=scandir):
+                files, _ = self._collect_with_workers(workers)
+            arcnames = sorted(arcname.split("/", 1)[1] for _, arcname in files)
+            self.assertEqual(arcnames, [".tarignore", "include_file.txt",
+                                        "mixed_dir/include.txt"], workers)
+
     def test_create_zip_archive(self):
         """Test creating a zip archive with exclusions"""
         output = os.path.join(self.test_dir, "output.zip")
@@ -116,6 +314,179 @@ class TestZipExcept(unittest.TestCase):
             self.assertFalse(any("mixed_dir/exclude.log" in f for f in files))
             self.assertFalse(any("exclude_dir" in f for f in files))
 
+    @unittest.skipUnless(hasattr(os, "link"), "hard links not supported")
+    def test_tar_hard_links(self):
+        """Test that hard-linked files are stored once, then as links"""
+        data = os.urandom(100000)
+        with open(os.path.join(self.test_dir, "big.bin"), "wb") as f:
+            f.write(data)
+        os.link(os.path.join(self.test_dir, "big.bin"),
+                os.path.join(self.test_dir, "mixed_dir", "big.bin"))
+        output = os.path.join(tempfile.mkdtemp(), "output.tar")
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+        create_archive(output, "tar", self.test_dir,
+                       os.path.join(self.test_dir, ".tarignore"))
+
+        self.assertLess(os.path.getsize(output), 2 * len(data))
+        with tarfile.open(output) as tar:
+            members = {m.name.split("/", 1)[1]: m for m in tar.getmembers()}
+            regular = [name for name in ("big.bin", "mixed_dir/big.bin")
+                       if members[name].isreg()]
+            self.assertEqual(len(regular), 1)
+            link = members[({"big.bin", "mixed_dir/big.bin"} - set(regular)).pop()]
+            self.assertTrue(link.islnk())
+            self.assertEqual(link.linkname, members[regular[0]].name)
+            self.assertEqual(link.size, 0)
+            self.assertEqual(tar.extractfile(link).read(), data)
+
+    def test_zip_uses_walk_stat(self):
+        """Test that zip entries get their metadata from the walk's stat"""
+        path = os.path.join(self.test_dir, "include_file.txt")
+        os.chmod(path, 0o640)
+        os.utime(path, (1500000000, 1500000000))
+        output = os.path.join(tempfile.mkdtemp(), "output.zip")
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+        with mock.patch("zipfile.ZipInfo.from_file") as from_file:
+            create_archive(output, "zip", self.test_dir,
+                           os.path.join(self.test_dir, ".tarignore"))
+        from_file.assert_not_called()
+
+        expected = zipfile.ZipInfo.from_file(path)
+        with zipfile.ZipFile(output) as zipf:
+            info = next(i for i in zipf.infolist() if i.filename.endswith("/include_file.txt"))
+            self.assertEqual(info.date_time, expected.date_time)
+            self.assertEqual(info.external_attr, expected.external_attr)
+            self.assertEqual(info.file_size, expected.file_size)
+
+    def test_zip_stores_compressed_formats(self):
+        """Test that already-compressed files are stored, others deflated"""
+        for name in ("photo.jpg", "bundle.zip"):
+            with open(os.path.join(self.test_dir, name), "wb") as f:
+                f.write(b"x" * 1000)
+        output = os.path.join(self.test_dir, "output.zip")
+        create_archive(output, "zip", self.test_dir, os.path.join(self.test_dir, ".tarignore"))
+        
+        with zipfile.ZipFile(output) as zipf:
+            types = {info.filename.split("/", 1)[1]: info.compress_type
+                     for info in zipf.infolist()}
+        self.assertEqual(types["photo.jpg"], zipfile.ZIP_STORED)
+        self.assertEqual(types["bundle.zip"], zipfile.ZIP_STORED)
+        self.assertEqual(types["include_file.txt"], zipfile.ZIP_DEFLATED)
+    
+    def test_compresslevel(self):
+        """Test that compresslevel reaches the zip and gzip writers"""
+        with open(os.path.join(self.test_dir, "data.txt"), "w") as f:
+            f.write("compressible text\n" * 10000)
+        
+        for archive_type, ext in (("zip", "zip"), ("tar", "tar.gz")):
+            sizes = {}
+            for level in (0, 9):
+                output = os.path.join(tempfile.mkdtemp(), f"output.{ext}")
+                self.addCleanup(shutil.rmtree, os.path.dirname(output))
+                create_archive(output, archive_type, self.test_dir, compress=True,
+                               native=False, compresslevel=level)
+                sizes[level] = os.path.getsize(output)
+            self.assertGreater(sizes[0], sizes[9] * 10, archive_type)
+    
+    def test_cli_level(self):
+        """Test that -l/--level is passed on as compresslevel"""
+        argv = ["zipexcept", "-o", "out", "-f", "zip", "-l", "1", self.test_dir]
+        with mock.patch("sys.argv", argv), \
+                mock.patch("zipexcept.main.create_archive") as create:
+            main()
+        self.assertEqual(create.call_args[1]["compresslevel"], 1)
+
+    def test_read_workers(self):
+        """Test that files are only read ahead on threads when asked for"""
+        contents = {}
+        for read_workers in (1, 2):
+            output = os.path.join(tempfile.mkdtemp(), "output.tar")
+            self.addCleanup(shutil.rmtree, os.path.dirname(output))
+            with mock.patch("concurrent.futures.ThreadPoolExecutor",
+                            wraps=ThreadPoolExecutor) as executor:
+                create_archive(output, "tar", self.test_dir,
+                               os.path.join(self.test_dir, ".tarignore"),
+                               read_workers=read_workers)
+            self.assertEqual(executor.called, read_workers > 1)
+            with tarfile.open(output) as tar:
+                contents[read_workers] = sorted(
+                    (m.name, tar.extractfile(m).read()) for m in tar.getmembers())
+        self.assertEqual(contents[1], contents[2])
+
+    def test_progress(self):
+        """Test that progress is only written to stderr when asked for"""
+        output = os.path.join(self.test_dir, "output.tar")
+        for archive_type in ("tar", "zip"):
+            for progress in (False, True):
+                stderr = io.StringIO()
+                with contextlib.redirect_stderr(stderr), \
+                        mock.patch("zipexcept.main.PROGRESS_INTERVAL", 1):
+                    create_archive(output, archive_type, self.test_dir,
+                                   os.path.join(self.test_dir, ".tarignore"),
+                                   progress=progress)
+                os.remove(output)
+                if progress:
+                    self.assertIn("\rAdded 1/3 files", stderr.getvalue())
+                    self.assertTrue(stderr.getvalue().endswith("\rAdded 3/3 files\n"))
+                else:
+                    self.assertEqual(stderr.getvalue(), "")
+
+    def _create_tar_gz(self, **kwargs):
+        """Create a .tar.gz of the test directory and return its member names"""
+        output = os.path.join(self.test_dir, "output.tar.gz")
+        create_archive(output, "tar", self.test_dir,
+                       os.path.join(self.test_dir, ".tarignore"), compress=True, **kwargs)
+        with tarfile.open(output, "r:gz") as tar:
+            return sorted(name.split("/", 1)[1] for name in tar.getnames())
+    
+    def test_create_tar_archive_without_native(self):
+        """Test that native=False always uses tarfile"""
+        with mock.patch("subprocess.Popen") as popen:
+            files = self._create_tar_gz(native=False)
+        popen.assert_not_called()
+        self.assertEqual(files, [".tarignore", "include_file.txt", "mixed_dir/include.txt"])
+    
+    def test_native_tar_falls_back_without_binaries(self):
+        """Test the tarfile fallback when tar or pigz is not installed"""
+        with mock.patch("shutil.which", return_value=None), \
+                mock.patch("subprocess.Popen") as popen:
+            files = self._create_tar_gz()
+        popen.assert_not_called()
+        self.assertEqual(files, [".tarignore", "include_file.txt", "mixed_dir/include.txt"])
+    
+    @unittest.skipUnless(shutil.which("tar") and os.path.exists("/bin/false"),
+                         "requires tar and /bin/false")
+    def test_native_tar_falls_back_on_failure(self):
+        """Test that a failing tar | pigz pipeline falls back to tarfile"""
+        tools = {"tar": shutil.which("tar"), "pigz": "/bin/false"}
+        stderr = io.StringIO()
+        with mock.patch("shutil.which", side_effect=tools.get), \
+                contextlib.redirect_stderr(stderr):
+            files = self._create_tar_gz()
+        self.assertIn("falling back to tarfile", stderr.getvalue())
+        self.assertEqual(files, [".tarignore", "include_file.txt", "mixed_dir/include.txt"])
+    
+    @unittest.skipUnless(shutil.which("tar") and shutil.which("gzip") and os.name == "posix",
+                         "requires tar and gzip")
+    def test_native_tar(self):
+        """Test creating a .tar.gz with the system tar and pigz"""
+        # Stand in for pigz with gzip, ignoring pigz's options
+        pigz = os.path.join(tempfile.mkdtemp(), "pigz")
+        self.addCleanup(shutil.rmtree, os.path.dirname(pigz))
+        with open(pigz, "w") as f:
+            f.write("#!/bin/sh\nexec gzip -c\n")
+        os.chmod(pigz, 0o755)
+        
+        tools = {"tar": shutil.which("tar"), "pigz": pigz}
+        stderr = io.StringIO()
+        with mock.patch("shutil.which", side_effect=tools.get), \
+                mock.patch("subprocess.Popen", wraps=subprocess.Popen) as popen, \
+                contextlib.redirect_stderr(stderr):
+            files = self._create_tar_gz()
+        self.assertEqual(popen.call_count, 2)
+        self.assertNotIn("falling back", stderr.getvalue())
+        self.assertEqual(files, [".tarignore", "include_file.txt", "mixed_dir/include.txt"])
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file